@@ -1,36 +1,113 @@
+import atexit
 import logging
+import logging.handlers
 import sys
+import threading
 from typing import Optional
 
+# Buffered file logging: records are written in batches instead of one write per record
+BUFFER_CAPACITY = 1024
+FLUSH_INTERVAL_SECONDS = 30.0
+
+# Log file rotation: cap growth at LOG_MAX_BYTES per file, keeping LOG_BACKUP_COUNT old files
+LOG_MAX_BYTES = 5_000_000
+LOG_BACKUP_COUNT = 3
+
+_flush_stop: Optional[threading.Event] = None
+# Handler flushed at interpreter exit; replaced on every setup_logging call
+_exit_flush_handler: Optional[logging.Handler] = None
+
+
+@atexit.register
+def _flush_at_exit() -> None:
+    """Flush the buffered handler from the most recent setup_logging call."""
+    if _exit_flush_handler is not None:
+        _exit_flush_handler.flush()
+
+
+def _start_periodic_flush(handler: logging.Handler, interval: float) -> None:
+    """Flush the given handler every `interval` seconds from a daemon thread."""
+    global _flush_stop
+    if _flush_stop is not None:
+        _flush_stop.set()
+
+    stop = threading.Event()
+    _flush_stop = stop
+
+    def _run():
+        while not stop.wait(interval):
+            handler.flush()
+
+    threading.Thread(target=_run, name="log-flush", daemon=True).start()
+
+
 def setup_logging(level_name: str = "INFO", format_str: Optional[str] = None, file_path: str = "rooster_automation.log") -> None:
     """
     Configure logging for the application using a centralized setup.
-    
+
+    File output goes through a MemoryHandler that flushes when full, on ERROR,
+    every FLUSH_INTERVAL_SECONDS and at interpreter exit. The log file is
+    rotated and only opened on the first write.
+
     Args:
         level_name: Logging level (DEBUG, INFO, WARNING, ERROR, CRITICAL)
         format_str: Optional custom format string
         file_path: Path to the log file
     """
+    global _exit_flush_handler
     if format_str is None:
         format_str = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-        
+
     level = getattr(logging, level_name.upper(), logging.INFO)
-    
+
+    # Skip per-record process/thread bookkeeping the format string doesn't use
+    logging.logProcesses = "%(process" in format_str
+    logging.logThreads = "%(thread" in format_str
+    logging.logMultiprocessing = "%(processName" in format_str
+
     # Remove existing handlers to avoid duplication if called multiple times
     root_logger = logging.getLogger()
     if root_logger.handlers:
         for handler in root_logger.handlers[:]:
             root_logger.removeHandler(handler)
-            
+            # Drain any buffered records before dropping the handler
+            target = getattr(handler, "target", None)
+            handler.close()
+            if target is not None:
+                target.close()
+
+    # One formatter shared by file and console output
+    formatter = logging.Formatter(format_str)
+    
+    file_handler = logging.handlers.RotatingFileHandler(
+        file_path,
+        maxBytes=LOG_MAX_BYTES,
+        backupCount=LOG_BACKUP_COUNT,
+        encoding='utf-8',
+        delay=True
+    )
+    file_handler.setFormatter(formatter)
+    buffered_handler = logging.handlers.MemoryHandler(
+        capacity=BUFFER_CAPACITY,
+        flushLevel=logging.ERROR,
+        target=file_handler,
+        flushOnClose=True
+    )
+
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setFormatter(formatter)
+    
     logging.basicConfig(
         level=level,
-        format=format_str,
         handlers=[
-            logging.FileHandler(file_path, encoding='utf-8'),
-            logging.StreamHandler(sys.stdout)
+            buffered_handler,
+            console_handler
         ]
     )
-    
+
+    _exit_flush_handler = buffered_handler
+    _start_periodic_flush(buffered_handler, FLUSH_INTERVAL_SECONDS)
+
     # Set third-party loggers to warning to reduce noise
     logging.getLogger("urllib3").setLevel(logging.WARNING)
     logging.getLogger("googleapiclient").setLevel(logging.WARNING)
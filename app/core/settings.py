@@ -4,16 +4,88 @@ Uses Pydantic for validation and type safety.
 """
 
 import os
+import json
+import functools
 import yaml
 import logging
 from typing import List, Optional, Union, Literal
 from pathlib import Path
+from dotenv import load_dotenv
 from pydantic import BaseModel, Field, field_validator, SecretStr
-from pydantic_settings import BaseSettings, SettingsConfigDict
+
+# Prefer the libyaml-backed loader; fall back to pure Python if unavailable
+try:
+    from yaml import CSafeLoader as _YLoader
+except ImportError:
+    from yaml import SafeLoader as _YLoader
+
+logger = logging.getLogger(__name__)
+
+# Load .env into the process environment once, before Settings.load reads it
+load_dotenv()
 
 # Get the project base directory
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 CONFIG_PATH = BASE_DIR / "config" / "config.yaml"
+CONFIG_CACHE_PATH = CONFIG_PATH.with_suffix(".yaml.cache.json")
+
+# Environment variables read by Settings.load, with their defaults
+ENV_DEFAULTS = {
+    "ROI_EMAIL": "",
+    "ROI_PASSWORD": "",
+    "GMAIL_ADDRESS": "",
+    "GMAIL_APP_PASSWORD": "",
+    "TRIGGER_EMAIL_SENDER": "noreply@staff.nl",
+    "CALDAV_URL": "",
+    "CALDAV_USERNAME": "",
+    "CALDAV_PASSWORD": "",
+    "CALDAV_CALENDAR_NAME": "Rooster",
+    # Persisted folder (a volume in docker-compose); runtime state lives here
+    "SHARED_FOLDER_PATH": str(BASE_DIR / "shared"),
+}
+
+
+def _load_yaml_config() -> dict:
+    """
+    Load config.yaml, reusing a JSON sidecar cache when it is up to date.
+    
+    The cache records the (mtime_ns, size) of the YAML file it was built from
+    and is only used while both still match exactly, so a config.yaml replaced
+    by an older file (git checkout, cp -p, a bind mount) is read again. Cache
+    read/write failures are never fatal; we fall back to YAML.
+    """
+    try:
+        stat = CONFIG_PATH.stat()
+    except OSError:
+        return {}
+    source = [stat.st_mtime_ns, stat.st_size]
+    
+    try:
+        with open(CONFIG_CACHE_PATH, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+        if cache["source"] == source:
+            return cache["config"]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    
+    try:
+        with open(CONFIG_PATH, "r") as f:
+            yaml_config = yaml.load(f, Loader=_YLoader) or {}
+    except Exception as e:
+        logger.error(f"Failed to load config from {CONFIG_PATH}: {e}")
+        return {}
+    
+    # Write atomically so a concurrent reader never sees a partial cache
+    tmp_path = CONFIG_CACHE_PATH.with_name(CONFIG_CACHE_PATH.name + ".tmp")
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"source": source, "config": yaml_config}, f)
+        os.replace(tmp_path, CONFIG_CACHE_PATH)
+    except (OSError, TypeError, ValueError) as e:
+        logger.debug(f"Could not write config cache {CONFIG_CACHE_PATH}: {e}")
+    
+    return yaml_config
+
 
 class RoiOnlineSettings(BaseModel):
     url: str
@@ -64,36 +136,28 @@ class LoggingSettings(BaseModel):
     format: str = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
     file: str = "rooster_automation.log"
 
-class Settings(BaseSettings):
+class Settings(BaseModel):
     """
     Main Settings Class.
     Combines environment variables and YAML config.
+    Populated explicitly by Settings.load from a single env snapshot.
     """
     roi_online: RoiOnlineSettings
     gmail: GmailSettings
     schedule: ScheduleSettings
     caldav: CalDavSettings
     logging: LoggingSettings
-    
-    model_config = SettingsConfigDict(
-        env_file=".env",
-        env_file_encoding="utf-8",
-        extra="ignore"
-    )
+    shared_folder: str
 
     @classmethod
+    @functools.lru_cache(maxsize=1)
     def load(cls) -> "Settings":
         """
         Load settings from YAML and Environment variables.
+        The result is memoized, so repeated calls don't repeat the file/env I/O.
         """
-        # 1. Load YAML content
-        yaml_config = {}
-        if CONFIG_PATH.exists():
-            try:
-                with open(CONFIG_PATH, "r") as f:
-                    yaml_config = yaml.safe_load(f) or {}
-            except Exception as e:
-                logging.error(f"Failed to load config from {CONFIG_PATH}: {e}")
+        # 1. Load YAML content (served from the JSON sidecar when fresh)
+        yaml_config = _load_yaml_config()
         
         # 2. Extract sections from YAML
         roi_yaml = yaml_config.get("roi_online", {})
@@ -102,21 +166,22 @@ class Settings(BaseSettings):
         logging_yaml = yaml_config.get("logging", {})
         
         # 3. Merge with Environment Variables (Env vars take precedence/are required for secrets)
-        # We construct the dictionaries to pass to the constructor
+        # Env vars don't change after startup, so take a single snapshot
+        env = {key: os.environ.get(key, default) for key, default in ENV_DEFAULTS.items()}
         
         # ROI
         roi_data = {
             **roi_yaml,
-            "email": os.getenv("ROI_EMAIL", ""),
-            "password": os.getenv("ROI_PASSWORD", "")
+            "email": env["ROI_EMAIL"],
+            "password": env["ROI_PASSWORD"]
         }
         
         # Gmail
         gmail_data = {
             **gmail_yaml,
-            "address": os.getenv("GMAIL_ADDRESS", ""),
-            "app_password": os.getenv("GMAIL_APP_PASSWORD", ""),
-            "trigger_sender": os.getenv("TRIGGER_EMAIL_SENDER", "noreply@staff.nl")
+            "address": env["GMAIL_ADDRESS"],
+            "app_password": env["GMAIL_APP_PASSWORD"],
+            "trigger_sender": env["TRIGGER_EMAIL_SENDER"]
         }
         
         # Schedule
@@ -127,10 +192,10 @@ class Settings(BaseSettings):
         
         # CalDAV (Env dependent)
         caldav_data = {
-            "url": os.getenv("CALDAV_URL", ""),
-            "username": os.getenv("CALDAV_USERNAME", ""),
-            "password": os.getenv("CALDAV_PASSWORD", ""),
-            "calendar_name": os.getenv("CALDAV_CALENDAR_NAME", "Rooster")
+            "url": env["CALDAV_URL"],
+            "username": env["CALDAV_USERNAME"],
+            "password": env["CALDAV_PASSWORD"],
+            "calendar_name": env["CALDAV_CALENDAR_NAME"]
         }
         
         # Logging
@@ -141,7 +206,8 @@ class Settings(BaseSettings):
             gmail=gmail_data,
             schedule=schedule_data,
             caldav=caldav_data,
-            logging=logging_data
+            logging=logging_data,
+            shared_folder=env["SHARED_FOLDER_PATH"]
         )
 
     # Proxy properties to maintain backward compatibility where possible
@@ -202,11 +268,12 @@ class Settings(BaseSettings):
     @property
     def logging_file(self) -> str: return self.logging.file
 
+    @property
+    def state_dir(self) -> Path:
+        """Directory for state that must survive restarts and container rebuilds."""
+        return Path(self.shared_folder)
+
 # Global settings instance
-try:
-    settings = Settings.load()
-except Exception as e:
-    # Fallback/Error handling during import time if env vars are missing
-    logging.error(f"Failed to load settings: {e}")
-    # We might re-raise or allow it to fail later
-    raise
+# Errors propagate as-is: logging is not configured yet at import time, and the
+# module-level logging.error() used here before would implicitly run basicConfig
+settings = Settings.load()
@@ -3,6 +3,7 @@ Shared utilities for Rooster Automation.
 """
 
 import logging
+import random
 import time
 import functools
 from typing import Callable, Type, Tuple, Optional
@@ -13,7 +14,11 @@ def retry_on_failure(
     retries: int = 3,
     delay: float = 1.0,
     backoff: float = 2.0,
-    exceptions: Tuple[Type[Exception], ...] = (Exception,)
+    exceptions: Tuple[Type[Exception], ...] = (Exception,),
+    deadline: Optional[float] = None,
+    max_delay: float = 60.0,
+    jitter: float = 0.1,
+    should_retry: Optional[Callable[[Exception], bool]] = None
 ):
     """
     Decorator to retry a function on failure.
@@ -23,24 +28,40 @@ def retry_on_failure(
         delay: Initial delay between retries in seconds.
         backoff: Multiplier for delay after each failure.
         exceptions: Tuple of exceptions to catch and retry on.
+        deadline: Optional total time budget in seconds; no retry is started
+            if its delay would run past it.
+        max_delay: Ceiling for a single delay; the backoff schedule itself
+            keeps growing underneath it.
+        jitter: Relative random spread (+/-) applied to each delay, so
+            concurrent callers don't retry in lockstep.
+        should_retry: Optional predicate; a caught exception for which it
+            returns False is raised right away (permanent failures).
     """
     def decorator(func: Callable):
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
             current_delay = delay
             last_exception = None
+            give_up_at = time.monotonic() + deadline if deadline is not None else None
             
             for attempt in range(retries + 1):
                 try:
                     return func(*args, **kwargs)
                 except exceptions as e:
                     last_exception = e
+                    if should_retry is not None and not should_retry(e):
+                        logger.error(f"Function '{func.__name__}' failed: {e}. Not retryable.")
+                        break
+                    sleep_for = min(max_delay, current_delay) * (1 + random.uniform(-jitter, jitter))
+                    if give_up_at is not None and time.monotonic() + sleep_for > give_up_at:
+                        logger.error(f"Function '{func.__name__}' failed: {e}. Retry budget of {deadline:.1f}s exhausted.")
+                        break
                     if attempt < retries:
                         logger.warning(
                             f"Function '{func.__name__}' failed: {e}. "
-                            f"Retrying in {current_delay:.1f}s (Attempt {attempt + 1}/{retries})"
+                            f"Retrying in {sleep_for:.1f}s (Attempt {attempt + 1}/{retries})"
                         )
-                        time.sleep(current_delay)
+                        time.sleep(sleep_for)
                         current_delay *= backoff
                     else:
                         logger.error(f"Function '{func.__name__}' failed after {retries} retries.")
@@ -49,5 +70,3 @@ def retry_on_failure(
                 raise last_exception
         return wrapper
     return decorator
-
-# setup_logging moved to app.core.logging_config
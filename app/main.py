@@ -4,30 +4,36 @@ Monitors Gmail for trigger emails and downloads ROI Online roster.
 """
 
 import logging
-import schedule
 import time
-from datetime import datetime
-from dotenv import load_dotenv
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Optional
 
-from app.services.roi_scraper import ROIScraper
-from app.services.gmail_monitor import GmailMonitor
-from app.services.calendar_service import CalendarService
 from app.core.settings import settings
 from app.core.logging_config import setup_logging
 
-
-# Load environment variables
-load_dotenv()
-
-# Set up logging centrally
+# Set up logging centrally, before any other app module is imported
 setup_logging(
     level_name=settings.logging.level,
     format_str=settings.logging.format,
     file_path=settings.logging.file
 )
 
+from app.services.calendar_service import CalendarService
+from app.services.gmail_monitor import GmailMonitor
+
+# playwright is heavy and only needed once a roster is downloaded
+if TYPE_CHECKING:
+    from app.services.roi_scraper import ROIScraper
+
 logger = logging.getLogger(__name__)
 
+# Day names indexed by datetime.weekday() (Monday == 0)
+WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+
+# Old events only age by days: clean them up at most once per this interval
+CLEANUP_INTERVAL_SECONDS = 24 * 3600
+
 
 class RoosterAutomation:
     """Main automation orchestrator."""
@@ -36,7 +42,8 @@ class RoosterAutomation:
         """Initialize all components."""
         logger.info("Initializing Rooster Automation")
         
-        self.scraper = ROIScraper()
+        # Built on the first download, see the scraper property
+        self._scraper: Optional["ROIScraper"] = None
         self.monitor = GmailMonitor()
         
         # Initialize CalDAV storage
@@ -44,24 +51,46 @@ class RoosterAutomation:
         self.storage = CalendarService()
         
         self.active_days = settings.schedule.active_days
+        self._active_weekdays = frozenset(
+            WEEKDAYS.index(day) for day in self.active_days if day in WEEKDAYS
+        )
         self.start_hour = settings.schedule.start_hour
         self.end_hour = settings.schedule.end_hour
         
+        # Monotonic time of the last cleanup; None until the first download
+        self._last_cleanup: Optional[float] = None
+        
+    @property
+    def scraper(self) -> "ROIScraper":
+        """Get the ROI scraper, importing playwright and creating it on first use."""
+        if self._scraper is None:
+            from app.services.roi_scraper import ROIScraper
+            self._scraper = ROIScraper()
+        return self._scraper
+    
     def is_active_time(self) -> bool:
         """Check if current time is within active schedule."""
         now = datetime.now()
+        return (
+            now.weekday() in self._active_weekdays
+            and self.start_hour <= now.hour < self.end_hour
+        )
+    
+    def seconds_until_active(self) -> Optional[float]:
+        """
+        Seconds until the next active window opens (0 while inside one).
         
-        # Check day of week
-        day_name = now.strftime('%A').lower()
-        if day_name not in self.active_days:
-            return False
-        
-        # Check hour
-        current_hour = now.hour
-        if not (self.start_hour <= current_hour < self.end_hour):
-            return False
-        
-        return True
+        Returns None when the schedule has no active window at all.
+        """
+        if self.is_active_time():
+            return 0.0
+        now = datetime.now()
+        start_today = now.replace(hour=self.start_hour, minute=0, second=0, microsecond=0)
+        for offset in range(8):
+            start = start_today + timedelta(days=offset)
+            if start > now and start.weekday() in self._active_weekdays:
+                return (start - now).total_seconds()
+        return None
     
     def download_and_save_roster(self, target_week: int = None):
         """
@@ -74,23 +103,40 @@ class RoosterAutomation:
             logger.info("=" * 60)
             logger.info(f"Starting roster download process (Target Week: {target_week or 'Default'})")
             
-            # Download roster to temp location
+            # Download roster to temp location. Meanwhile connect to CalDAV and
+            # look up the calendar, so those round-trips overlap the browser work.
             temp_dir = "./temp_downloads"
-            ics_file = self.scraper.download_roster(temp_dir, target_week=target_week)
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                warmup = executor.submit(self.storage.get_calendar)
+                ics_file = self.scraper.download_roster(temp_dir, target_week=target_week)
+                warmup_error = warmup.exception()
+            if warmup_error is not None:
+                # save_ics_file connects again itself; just note why it may be slow
+                logger.warning(f"CalDAV warm-up failed: {warmup_error}")
             
             # Save to CalDAV
             result = self.storage.save_ics_file(ics_file)
             logger.info(f"✓ {result}")
             logger.info("Events are now synced to your iCloud Calendar")
             
-            # Auto-cleanup old events (now fast thanks to server-side search)
-            self.storage.delete_old_events(days_to_keep=90)
+            self._cleanup_if_due()
             
             logger.info("=" * 60)
             
         except Exception as e:
             logger.error(f"Error in download process: {e}", exc_info=True)
     
+    def _cleanup_if_due(self):
+        """Delete old CalDAV events, at most once per CLEANUP_INTERVAL_SECONDS."""
+        now = time.monotonic()
+        if self._last_cleanup is not None and now - self._last_cleanup < CLEANUP_INTERVAL_SECONDS:
+            logger.debug("Cleanup ran recently - skipping")
+            return
+        
+        # Auto-cleanup old events (now fast thanks to server-side search)
+        self.storage.delete_old_events(days_to_keep=90)
+        self._last_cleanup = now
+    
     def check_email_and_download(self):
         """Check for trigger email and download if found."""
         if not self.is_active_time():
@@ -117,10 +163,7 @@ class RoosterAutomation:
         logger.info(f"Calendar: {settings.caldav.calendar_name}")
         logger.info("=" * 60)
         
-        # Schedule the email check
-        # settings.gmail_check_interval is in seconds
-        interval_minutes = settings.gmail.check_interval_minutes
-        schedule.every(interval_minutes).minutes.do(self.check_email_and_download)
+        interval = settings.gmail.check_interval_minutes * 60
         
         # Run initial check (with error handling to prevent startup hang)
         logger.info("Running initial email check...")
@@ -132,14 +175,59 @@ class RoosterAutomation:
         
         logger.info("Entering main monitoring loop...")
         
-        # Keep running
+        # Between scheduled checks, new mail is pushed via IMAP IDLE (during active
+        # hours) and checked right away; the interval check stays as a safety net.
+        # Deadlines advance from the previous target on the monotonic clock, so
+        # checks don't drift or jump with NTP.
+        next_check = time.monotonic() + interval
         try:
             while True:
-                schedule.run_pending()
-                time.sleep(60)  # Check every minute if scheduled tasks need to run
+                off_hours_wait = self.seconds_until_active()
+                if off_hours_wait:
+                    # Sleep through the inactive period in one go, then check as
+                    # the window opens for anything that arrived meanwhile
+                    logger.info(f"Outside active hours - sleeping {off_hours_wait / 3600:.1f}h until the next window")
+                    time.sleep(off_hours_wait)
+                    next_check = time.monotonic()
+                    continue
+                
+                delay = next_check - time.monotonic()
+                if delay > 0:
+                    if self._wait_for_trigger(delay):
+                        self._run_check()
+                    continue
+                
+                self._run_check()
+                # A long download overran the interval: resume from now, don't burst
+                next_check = max(next_check + interval, time.monotonic())
                 
         except KeyboardInterrupt:
             logger.info("Automation stopped by user")
+        finally:
+            if self._scraper is not None:
+                self._scraper.close()
+            self.monitor.close()
+            self.storage.close()
+    
+    def _wait_for_trigger(self, timeout: float) -> bool:
+        """Wait up to `timeout` seconds for pushed mail; True if new mail arrived."""
+        if not self.is_active_time():
+            # Window just closed, or none is configured: just pace the loop
+            time.sleep(timeout)
+            return False
+        try:
+            return self.monitor.wait_for_new_mail(timeout)
+        except Exception as e:
+            logger.warning(f"Waiting for new mail failed: {e}. Falling back to the next scheduled check")
+            time.sleep(timeout)
+            return False
+    
+    def _run_check(self):
+        """Run one email check without letting an error end the main loop."""
+        try:
+            self.check_email_and_download()
+        except Exception as e:
+            logger.error(f"Email check failed: {e}")
 
 
 def main():
@@ -3,33 +3,124 @@ Calendar Service Module
 Handles uploading .ics events to CalDAV server (e.g., iCloud Calendar).
 """
 
+import functools
+import hashlib
+import json
 import logging
 import os
-import caldav
-import requests
-from datetime import datetime, timedelta
-from icalendar import Calendar
-from typing import List, Optional
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Dict, List, Optional, Set, Tuple, Type
 
 from app.core.settings import settings
 from app.core.utils import retry_on_failure
 
+# caldav (lxml, requests) is imported where it is used so that importing this
+# module stays cheap; these imports are for type hints only
+if TYPE_CHECKING:
+    import caldav
+    import requests
+
 logger = logging.getLogger(__name__)
 
+# Event uploads are independent PUTs, so overlap their network round-trips.
+# Kept conservative so a large roster doesn't trip iCloud's rate limiting.
+MAX_UPLOAD_WORKERS = 4
+# Deletes of old events are independent, small DELETEs: cleanup can fan out wider
+MAX_DELETE_WORKERS = 8
+# Pooled keep-alive connections per host; headroom above the busiest worker pool
+HTTP_POOL_MAXSIZE = 16
+
+# Initial size of the reusable .ics read buffer; grown on demand for larger files
+READ_BUFFER_SIZE = 1 << 20
+
+# The calendar collection list rarely changes; skip the PROPFIND within this window
+CALENDARS_CACHE_TTL_SECONDS = 300
+
+# Digest and server ETag per uploaded UID, so events that are unchanged on both
+# sides aren't PUT again on the next roster. Kept in the persisted shared folder
+# so the skip also works across rebuilds.
+CALDAV_STATE_PATH = settings.state_dir / ".caldav_state.json"
+
+# HTTP statuses a resend can't fix (malformed or refused request). 404 is not
+# listed: the service reconnects and retries on a moved/removed calendar
+PERMANENT_HTTP_STATUSES = frozenset({400, 403, 405, 412, 413, 415, 422})
+
+# caldav passes errmsg() ("400 Bad Request\n\n<body>") as the error's url
+# argument, not its .reason. Only that leading status line counts, never a
+# number in a real URL or in the response body after it
+_STATUS_RE = re.compile(r'([1-5]\d\d) [^\r\n]*\n\n')
+
+# Closing line appended to every uploaded VCALENDAR
+VCALENDAR_FOOTER = "END:VCALENDAR\r\n"
+
+# A complete VEVENT block (nested VALARMs included) with its line endings
+_VEVENT_RE = re.compile(r'^BEGIN:VEVENT\r?\n.*?^END:VEVENT(?:\r?\n|\Z)', re.MULTILINE | re.DOTALL)
+
+
+def _ics_property(block: str, name: str) -> Optional[str]:
+    """Return the unfolded raw value of the first `name` property in an .ics block."""
+    match = re.search(
+        rf'^{name}(?:;[^:\r\n]*)?:(.*(?:\r?\n[ \t].*)*)', block, re.MULTILINE
+    )
+    if match is None:
+        return None
+    return re.sub(r'\r?\n[ \t]', '', match.group(1)).rstrip('\r')
+
+
+def _is_retryable(error: Exception) -> bool:
+    """False when a CalDAV error's HTTP status says retrying the request can't help."""
+    import caldav
+    # Raised for both 401 and 403 with only the reason phrase ("Forbidden"), so
+    # it is treated as a 403: rejected credentials don't improve by resending.
+    # A save still reconnects once on it before this is consulted.
+    if isinstance(error, caldav.error.AuthorizationError):
+        return False
+    url = getattr(error, "url", None)
+    match = _STATUS_RE.match(url) if isinstance(url, str) else None
+    return match is None or int(match.group(1)) not in PERMANENT_HTTP_STATUSES
+
+
+def _etags_by_url(objects) -> Dict[str, Optional[str]]:
+    """Map each resource of a sync-collection result to its ETag (None if deleted)."""
+    from caldav.elements import dav
+    return {str(obj.url.canonical()): obj.props.get(dav.GetEtag.tag) for obj in objects}
+
+
+@functools.lru_cache(maxsize=1)
+def _reconnect_errors() -> Tuple[Type[BaseException], ...]:
+    """Errors after which a save reconnects; caldav is resolved once, on first failure."""
+    import caldav
+    # NotFoundError: the cached calendar was removed or moved on the server
+    return (caldav.error.AuthorizationError, caldav.error.NotFoundError, ConnectionError)
+
 
 class CalendarService:
     """Manages .ics file upload to CalDAV server."""
     
     def __init__(self):
         """Initialize Calendar Service."""
-        self._client: Optional[caldav.DAVClient] = None
+        self._client: Optional["caldav.DAVClient"] = None
         self._principal = None
-        self._calendar_cache = None
+        # HTTP session kept for the service lifetime so reconnects reuse TCP/TLS
+        self._session: Optional["requests.Session"] = None
+        # Serializes reconnects triggered from concurrent upload workers
+        self._connection_lock = threading.Lock()
+        # principal.calendars() listing, refreshed after CALENDARS_CACHE_TTL_SECONDS
+        self._calendars_cache: Optional[list] = None
+        self._calendars_cache_ts = 0.0
+        # Same listing keyed by display name, for O(1) lookups
+        self._calendars_by_name: dict = {}
+        # Reused across uploads so reading a roster doesn't allocate a fresh buffer
+        self._read_buffer = bytearray(READ_BUFFER_SIZE)
         
         logger.info("CalendarService initialized")
     
     @property
-    def client(self) -> caldav.DAVClient:
+    def client(self) -> "caldav.DAVClient":
         """Get CalDAV client, creating connection if needed."""
         if self._client is None:
             self._connect()
@@ -42,9 +133,14 @@ class CalendarService:
             self._connect()
         return self._principal
     
-    @retry_on_failure(retries=3, delay=2, backoff=2)
+    # Transient resets recover quickly: fail fast (0.1, 0.2, 0.4 s, ...) within a 10 s budget
+    @retry_on_failure(retries=5, delay=0.1, backoff=2, deadline=10, should_retry=_is_retryable)
     def _connect(self):
         """Establish connection to CalDAV server."""
+        import caldav
+        import requests
+        from requests.adapters import HTTPAdapter
+        
         logger.info(f"Connecting to CalDAV server: {settings.caldav_url}")
         
         self._client = caldav.DAVClient(
@@ -53,15 +149,34 @@ class CalendarService:
             password=settings.caldav_password
         )
         
+        # DAVClient always builds its own session; swap in the long-lived one
+        if self._session is None:
+            self._session = requests.Session()
+            # iCloud redirects to a partition host, so pool a few hosts, each with
+            # enough keep-alive connections for every worker. No transport-level
+            # retries: retry_on_failure owns them, with its deadline and
+            # _is_retryable, instead of multiplying the attempts.
+            adapter = HTTPAdapter(
+                pool_connections=4,
+                pool_maxsize=HTTP_POOL_MAXSIZE,
+                max_retries=0
+            )
+            self._session.mount("https://", adapter)
+            self._session.mount("http://", adapter)
+        self._client.session.close()
+        self._client.session = self._session
+        
         # Test connection by getting principal
         self._principal = self._client.principal()
         logger.info("✓ Successfully connected to CalDAV server")
 
     def _reset_connection(self):
-        """Reset connection state."""
+        """Reset connection state (the HTTP session is kept for reuse)."""
         self._client = None
         self._principal = None
-        self._calendar_cache = None
+        self._calendars_cache = None
+        # Invalidate the cached_property so the next access looks it up again
+        self.__dict__.pop('calendar', None)
         logger.debug("Connection state reset")
 
     @property
@@ -74,21 +189,38 @@ class CalendarService:
         """Get the configured calendar name."""
         return settings.caldav_calendar_name
 
-    @retry_on_failure(retries=2, delay=1)
+    @functools.cached_property
+    def calendar(self):
+        """The calendar for storing roster events, looked up once per connection."""
+        return self._lookup_calendar()
+
     def get_calendar(self):
         """Get or find the calendar for storing roster events."""
-        if self._calendar_cache is not None:
-            return self._calendar_cache
-        
-        calendars = self.principal.calendars()
+        return self.calendar
+
+    def _get_calendars(self) -> list:
+        """Get the principal's calendars, cached for CALENDARS_CACHE_TTL_SECONDS."""
+        now = time.monotonic()
+        if self._calendars_cache is None or now - self._calendars_cache_ts >= CALENDARS_CACHE_TTL_SECONDS:
+            self._calendars_cache = self.principal.calendars()
+            self._calendars_by_name = {}
+            for cal in self._calendars_cache:
+                # Keep the first of any duplicate names, like the old linear scan did
+                self._calendars_by_name.setdefault(cal.name, cal)
+            self._calendars_cache_ts = now
+        return self._calendars_cache
+
+    @retry_on_failure(retries=2, delay=1, should_retry=_is_retryable)
+    def _lookup_calendar(self):
+        """Find the configured calendar on the server."""
+        calendars = self._get_calendars()
         target_name = settings.caldav_calendar_name
         
         # Try to find existing calendar by name
-        for cal in calendars:
-            if cal.name == target_name:
-                logger.info(f"Found calendar: {target_name}")
-                self._calendar_cache = cal
-                return cal
+        cal = self._calendars_by_name.get(target_name)
+        if cal is not None:
+            logger.info(f"Found calendar: {target_name}")
+            return cal
         
         # Fallback to first available calendar
         if calendars:
@@ -96,7 +228,6 @@ class CalendarService:
                 f"Calendar '{target_name}' not found. "
                 f"Using first available: {calendars[0].name}"
             )
-            self._calendar_cache = calendars[0]
             return calendars[0]
         
         raise ValueError("No calendars found on CalDAV server")
@@ -106,133 +237,294 @@ class CalendarService:
         Upload .ics file content to CalDAV server.
         Parses the .ics file and uploads each event individually.
         """
-        if not os.path.exists(source_path):
-            raise FileNotFoundError(f"Source file not found: {source_path}")
+        # Only the header and the VEVENT blocks are kept; the full file text is
+        # released right after splitting instead of living through the upload.
+        # open() reports a missing file itself, no separate exists() stat.
+        try:
+            content = self._read_ics(source_path)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Source file not found: {source_path}") from None
+        header, vevents = self._split_ics(content)
+        del content
         
-        logger.info(f"Reading .ics file: {source_path}")
-        with open(source_path, 'rb') as f:
-            cal = Calendar.from_ical(f.read())
+        calendar = self.calendar
+        return self._upload_events(calendar, header, vevents)
+
+    def _read_ics(self, source_path: str) -> str:
+        """Read an .ics file into the reusable buffer and decode it."""
+        logger.debug(f"Reading .ics file: {source_path}")
+        with open(source_path, 'rb', buffering=0) as f:
+            size = os.fstat(f.fileno()).st_size
+            if size > len(self._read_buffer):
+                self._read_buffer.extend(bytes(size - len(self._read_buffer)))
+            
+            total = 0
+            # The view must be released before the buffer can be resized again
+            with memoryview(self._read_buffer) as view:
+                while total < size:
+                    n = f.readinto(view[total:size])
+                    if not n:
+                        break
+                    total += n
+                # Decode straight from the populated slice, no intermediate bytes copy
+                return str(view[:total], 'utf-8')
+
+    @staticmethod
+    def _split_ics(content: str) -> Tuple[str, List[str]]:
+        """
+        Split raw .ics text into the VCALENDAR header and the raw VEVENT blocks.
+        The header keeps everything that is not a VEVENT (VERSION, PRODID,
+        VTIMEZONE, ...) minus the closing END:VCALENDAR line.
+        """
+        if not content.lstrip().startswith('BEGIN:VCALENDAR'):
+            raise ValueError("Invalid .ics file: no VCALENDAR found")
         
-        calendar = self.get_calendar()
-        return self._upload_events(calendar, cal)
+        blocks = _VEVENT_RE.findall(content)
+        rest = _VEVENT_RE.sub('', content).rstrip()
+        if not rest.endswith('END:VCALENDAR'):
+            raise ValueError("Invalid .ics file: missing END:VCALENDAR")
+        header = rest[:-len('END:VCALENDAR')]
+        return header, blocks
 
-    def _upload_events(self, calendar, cal: Calendar) -> str:
-        """Upload events from parsed calendar to CalDAV."""
-        logger.info(f"Uploading events to calendar: {calendar.name}")
+    def _upload_events(self, calendar, header: str, vevents: List[str]) -> str:
+        """Upload raw VEVENT blocks to CalDAV."""
+        # Events are uploaded as carved out of the text: no icalendar parse and
+        # re-serialize round-trip, each upload is header + blocks + footer
+        logger.info("Uploading %d events to calendar: %s", len(vevents), calendar.name)
         
-        # Extract VTIMEZONE components to include in every single-event ICS
-        # This ensures timezone references (TZID) in events are valid
-        timezones = [c for c in cal.walk() if c.name == 'VTIMEZONE']
+        known, sync_token = self._load_sync_state(calendar)
+        synced: Dict[str, dict] = {}
+        uploaded_urls: Set[str] = set()
         
         events_uploaded = 0
+        events_skipped = 0
         events_failed = 0
         failed_events = []
+        pending = []
+        for blocks in self._group_by_uid(vevents):
+            uid = _ics_property(blocks[0], 'UID')
+            digest = hashlib.sha1("".join([header, *blocks]).encode('utf-8'), usedforsecurity=False).hexdigest()
+            entry = known.get(uid) if uid else None
+            if entry is not None and entry["digest"] == digest:
+                # Same content as our last PUT and still on the server with its ETag
+                synced[uid] = entry
+                events_skipped += len(blocks)
+            else:
+                pending.append((uid, digest, blocks))
         
-        for component in cal.walk():
-            if component.name == "VEVENT":
-                if self._upload_single_event(calendar, cal, component, timezones):
-                    events_uploaded += 1
+        with ThreadPoolExecutor(max_workers=MAX_UPLOAD_WORKERS) as executor:
+            futures = {
+                executor.submit(self._upload_event_resource, calendar, header, blocks): (uid, digest, blocks)
+                for uid, digest, blocks in pending
+            }
+            for future in as_completed(futures):
+                uid, digest, blocks = futures[future]
+                url = future.result()
+                if url:
+                    events_uploaded += len(blocks)
+                    uploaded_urls.add(url)
+                    if uid:
+                        synced[uid] = {"url": url, "digest": digest}
                 else:
-                    events_failed += 1
-                    failed_events.append(component.get('SUMMARY', 'Unknown'))
+                    events_failed += len(blocks)
+                    failed_events.extend(_ics_property(b, 'SUMMARY') or 'Unknown' for b in blocks)
 
-        logger.info(f"Upload complete: {events_uploaded} succeeded, {events_failed} failed")
+        logger.info(
+            "Upload complete: %d succeeded, %d unchanged, %d failed",
+            events_uploaded, events_skipped, events_failed
+        )
         
-        if events_uploaded == 0:
+        if events_uploaded == 0 and events_skipped == 0:
             raise ValueError("No events were successfully uploaded")
             
         if failed_events:
-            logger.warning(f"Failed events: {failed_events[:3]}...")
+            logger.warning("Failed events: %s...", failed_events[:3])
+        
+        self._save_sync_state(calendar, sync_token, synced, uploaded_urls)
 
-        return f"Uploaded {events_uploaded} events to calendar: {calendar.name}"
+        result = f"Uploaded {events_uploaded} events to calendar: {calendar.name}"
+        if events_skipped:
+            result += f" ({events_skipped} unchanged, skipped)"
+        return result
 
-    def _upload_single_event(self, calendar, source_cal, component, timezones=None) -> bool:
-        """Helper to upload a single event with retry."""
-        event_summary = component.get('SUMMARY', 'No title')
+    def _load_sync_state(self, calendar) -> Tuple[Dict[str, dict], Optional[str]]:
+        """
+        Load the events we uploaded before that are still on the server unchanged.
+        
+        An entry is only kept when the calendar listing (RFC 6578 sync-collection
+        without a token: every href + ETag) still has its URL with the ETag we
+        recorded, so an event deleted or edited on the server is uploaded again
+        whether or not the server reports deletions.
         
+        Returns ({uid: {"url", "digest", "etag"}}, sync_token of the listing). Both
+        are empty when the listing fails; then every event is uploaded.
+        """
         try:
-            # Create a new calendar object for the single event
-            event_cal = Calendar()
-            
-            # Copy basic properties (PRODID, VERSION, etc.)
-            for key, value in source_cal.items():
-                event_cal.add(key, value)
-            
-            # Add timezones if available
-            if timezones:
-                for tz in timezones:
-                    event_cal.add_component(tz)
-            
-            # Add the event itself
-            event_cal.add_component(component)
-            
-            event_ics = event_cal.to_ical().decode('utf-8')
+            listing = calendar.objects_by_sync_token(None, load_objects=False)
+            etags = _etags_by_url(listing)
+        except Exception as e:
+            logger.info(f"CalDAV sync-collection failed, uploading all events: {e}")
+            return {}, None
+        
+        try:
+            state = json.loads(CALDAV_STATE_PATH.read_text(encoding="utf-8"))
+            if state["calendar_url"] != str(calendar.url.canonical()):
+                return {}, listing.sync_token
+            known = {
+                uid: entry for uid, entry in state["resources"].items()
+                if entry.get("etag") is not None and etags.get(entry["url"]) == entry["etag"]
+            }
+        except FileNotFoundError:
+            return {}, listing.sync_token
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            logger.warning(f"Ignoring unreadable {CALDAV_STATE_PATH}: {e}")
+            return {}, listing.sync_token
+        return known, listing.sync_token
+
+    def _save_sync_state(self, calendar, sync_token: Optional[str], synced: Dict[str, dict], uploaded_urls: Set[str]):
+        """
+        Persist `synced` with the ETag of every resource. Those of our own PUTs
+        come from the changes since `sync_token`; resources someone else changed
+        meanwhile are left out. Failures only cost a full upload next run.
+        """
+        if not sync_token:
+            return
+        state = {"calendar_url": str(calendar.url.canonical()), "resources": synced}
+        if uploaded_urls:
+            try:
+                changes = _etags_by_url(calendar.objects_by_sync_token(sync_token, load_objects=False))
+            except Exception as e:
+                logger.debug(f"Could not fetch the ETags of uploaded events: {e}")
+                return
+            resources = {}
+            for uid, entry in synced.items():
+                if entry["url"] not in changes:
+                    resources[uid] = entry
+                elif entry["url"] in uploaded_urls and changes[entry["url"]] is not None:
+                    resources[uid] = {**entry, "etag": changes[entry["url"]]}
+            state["resources"] = resources
+        
+        tmp_path = CALDAV_STATE_PATH.with_suffix(".json.tmp")
+        try:
+            CALDAV_STATE_PATH.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path.write_text(json.dumps(state), encoding="utf-8")
+            os.replace(tmp_path, CALDAV_STATE_PATH)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Could not save CalDAV sync state: {e}")
+
+    @staticmethod
+    def _group_by_uid(vevents: List[str]) -> List[List[str]]:
+        """
+        Group VEVENT blocks into CalDAV resources: one resource per UID.
+        A recurring event's master and its RECURRENCE-ID overrides share a UID
+        and must be stored together (RFC 4791 4.1), otherwise each PUT to the
+        same UID would overwrite the previous one. Events without UID stand alone.
+        """
+        groups = {}
+        for index, block in enumerate(vevents):
+            uid = _ics_property(block, 'UID')
+            key = uid if uid else index
+            groups.setdefault(key, []).append(block)
+        return list(groups.values())
+
+    def _upload_event_resource(self, calendar, header: str, blocks: List[str]) -> Optional[str]:
+        """Helper to upload the VEVENT(s) of a single UID with retry; returns the resource URL."""
+        try:
+            event_ics = "".join([header, *blocks, VCALENDAR_FOOTER])
             
             # Simple retry for the save operation
-            self._save_event_with_retry(calendar, event_ics)
+            event = self._save_event_with_retry(calendar, event_ics)
             
-            logger.debug(f"  ✓ Uploaded: {event_summary}")
-            return True
+            # Hot path: skip extracting the summary when DEBUG is off
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("  ✓ Uploaded: %s", _ics_property(blocks[0], 'SUMMARY') or 'No title')
+            return str(event.url.canonical())
             
         except Exception as e:
-            logger.warning(f"  ✗ Failed to upload '{event_summary}': {e}")
-            return False
+            logger.warning(
+                "  ✗ Failed to upload '%s': %s", _ics_property(blocks[0], 'SUMMARY') or 'No title', e
+            )
+            return None
 
-    @retry_on_failure(retries=2, delay=1)
+    @retry_on_failure(retries=2, delay=0.25, deadline=10, should_retry=_is_retryable)
     def _save_event_with_retry(self, calendar, event_ics):
         """Save event to calendar with retry."""
         try:
-            calendar.save_event(event_ics)
-        except (caldav.error.AuthorizationError, ConnectionError):
-            # Force reset on connection/auth errors
-            self._reset_connection()
-            # Re-fetch calendar to ensure valid connection
-            calendar = self.get_calendar()
-            calendar.save_event(event_ics)
-
-    @retry_on_failure(retries=2, delay=1)
+            return calendar.save_event(event_ics)
+        except _reconnect_errors():
+            # Force reset on connection/auth errors. Other workers may hit the
+            # same failure, so only reset if nobody has reconnected yet.
+            with self._connection_lock:
+                if self.__dict__.get('calendar') is calendar:
+                    self._reset_connection()
+                # Re-fetch calendar to ensure valid connection
+                calendar = self.calendar
+            return calendar.save_event(event_ics)
+
+    @retry_on_failure(retries=2, delay=1, should_retry=_is_retryable)
     def list_calendars(self) -> List[str]:
         """List all available calendars."""
-        calendars = self.principal.calendars()
+        calendars = self._get_calendars()
         calendar_names = [cal.name for cal in calendars]
         logger.info(f"Found {len(calendar_names)} calendars: {calendar_names}")
         return calendar_names
     
-    @retry_on_failure(retries=2, delay=1)
+    @retry_on_failure(retries=2, delay=1, should_retry=_is_retryable)
     def delete_old_events(self, days_to_keep: int = 90) -> int:
         """Remove events older than specified days using server-side filtering."""
         logger.info(f"Cleaning up events older than {days_to_keep} days")
         
-        calendar = self.get_calendar()
-        cutoff_date = datetime.now() - timedelta(days=days_to_keep)
+        calendar = self.calendar
+        # Timezone-aware UTC bounds: the time-range filter is evaluated in UTC,
+        # so this avoids any local-time guessing for naive datetimes
+        cutoff_date = datetime.now(timezone.utc) - timedelta(days=days_to_keep)
         # Look back up to 5 years to ensure we catch old stuff without querying "forever"
         start_date = cutoff_date - timedelta(days=365 * 5)
         
         try:
-            # Server-side search is O(log N) or O(1) depending on server implementation
-            # compared to O(N) client-side iteration
-            events = calendar.date_search(start=start_date, end=cutoff_date)
+            # Server-side calendar-query REPORT with a time-range filter is O(log N) or
+            # O(1) depending on server implementation, compared to O(N) client-side
+            # iteration. expand=False keeps recurring events as their master resource.
+            try:
+                events = calendar.search(start=start_date, end=cutoff_date, event=True, expand=False)
+            except NotImplementedError:
+                events = calendar.date_search(start=start_date, end=cutoff_date)
             logger.info(f"Found {len(events)} old events to delete (Server-side search)")
         except Exception as e:
             logger.warning(f"Server-side search failed: {e}. Aborting cleanup to avoid O(N) impact.")
+            if isinstance(e, _reconnect_errors()):
+                # Don't keep serving a stale calendar/connection to the next run
+                self._reset_connection()
             return 0
         
         removed_count = 0
         
-        # Batch deletion could be faster if supported, but simple iteration on the *result set* is already much better
-        for event in events:
-            try:
-                event.delete()
-                removed_count += 1
-            except Exception as e:
-                logger.warning(f"Could not delete event: {e}")
+        # CalDAV has no batch delete, so overlap the per-resource DELETE round-trips
+        with ThreadPoolExecutor(max_workers=MAX_DELETE_WORKERS) as executor:
+            for event, error in executor.map(self._delete_event, events):
+                if error is None:
+                    removed_count += 1
+                else:
+                    logger.warning("Could not delete event %s: %s", getattr(event, 'url', 'unknown'), error)
         
         logger.info(f"✓ Cleanup complete. Removed {removed_count} old events")
         return removed_count
     
+    @staticmethod
+    def _delete_event(event) -> Tuple[object, Optional[Exception]]:
+        """Helper to delete a single event; returns the error instead of raising it."""
+        try:
+            event.delete()
+            return event, None
+        except Exception as e:
+            return event, e
+    
     def close(self):
         """Close connection."""
         self._reset_connection()
+        if self._session is not None:
+            self._session.close()
+            self._session = None
 
     def __enter__(self):
         return self
@@ -5,95 +5,217 @@ Monitors Gmail inbox for trigger emails.
 
 import imaplib
 import email
+import json
 import logging
+import os
+import select
+import ssl
 import time
+from datetime import datetime, timedelta, timezone
 from email.header import decode_header
 import re
 from typing import Optional, Callable, Dict, Any
-from contextlib import contextmanager
 
 from app.core.settings import settings
 from app.core.utils import retry_on_failure
 
 logger = logging.getLogger(__name__)
 
+IMAP_HOST = "imap.gmail.com"
+IMAP_TIMEOUT_SECONDS = 15
+
+# Re-issue IDLE before Gmail's 30 minute cutoff drops the connection
+IDLE_TIMEOUT_SECONDS = 29 * 60
+
+# Errors that mean the pooled IMAP connection is unusable and must be rebuilt
+_CONNECTION_ERRORS = (imaplib.IMAP4.abort, imaplib.IMAP4.error, OSError)
+
+# Last processed trigger UID (with its UIDVALIDITY), so restarts neither re-fire nor
+# miss. Kept in the persisted shared folder so it also survives container rebuilds.
+GMAIL_STATE_PATH = settings.state_dir / ".gmail_state.json"
+
+# Without a stored UID (fresh install), pick up trigger emails this recent
+BASELINE_SEARCH_DAYS = 2
+
+# Everything the week extraction needs, without marking the message as read:
+# just enough headers to parse the MIME structure, plus the body
+_FETCH_TRIGGER_PARTS = (
+    "(BODY.PEEK[HEADER.FIELDS (SUBJECT MIME-VERSION CONTENT-TYPE CONTENT-TRANSFER-ENCODING)]"
+    " BODY.PEEK[TEXT])"
+)
+
 
 class GmailMonitor:
     """Monitor Gmail inbox for trigger emails."""
     
     def __init__(self):
         """Initialize Gmail monitor."""
-        self.last_checked_uid: Optional[bytes] = None
+        self.last_checked_uid: Optional[int] = None
+        # UIDVALIDITY of the inbox; UIDs are only comparable within one value
+        self._uidvalidity: Optional[int] = None
+        # Logged-in connection with INBOX selected, reused across polls
+        self._mail: Optional[imaplib.IMAP4_SSL] = None
+        # Whether the inbox may have changed since the last complete check.
+        # The server reports new messages with EXISTS (on NOOP or during IDLE),
+        # so polls without one can skip the SEARCH entirely.
+        self._inbox_changed = True
+        self._load_state()
         logger.info(f"GmailMonitor initialized for {settings.gmail_address}")
     
-    @contextmanager
-    def connect(self, timeout: int = 10):
-        """Connect to Gmail via IMAP using a context manager."""
+    def _get_mail(self) -> imaplib.IMAP4_SSL:
+        """Get the pooled IMAP connection, reconnecting if it has gone stale."""
+        if self._mail is not None:
+            try:
+                # Cheap liveness probe; also picks up new EXISTS for the selected inbox
+                self._mail.noop()
+                if self._mail.response("EXISTS")[1][0] is not None:
+                    self._inbox_changed = True
+                return self._mail
+            except _CONNECTION_ERRORS as e:
+                logger.debug(f"Pooled IMAP connection is stale ({e}), reconnecting")
+                self._reset_connection()
+        
         logger.debug("Connecting to Gmail IMAP...")
-        mail = None
+        mail = imaplib.IMAP4_SSL(IMAP_HOST, timeout=IMAP_TIMEOUT_SECONDS)
         try:
-            mail = imaplib.IMAP4_SSL("imap.gmail.com", timeout=timeout)
             mail.login(settings.gmail.address, settings.gmail.app_password)
-            logger.debug("✓ Successfully connected to Gmail")
-            yield mail
-        except Exception as e:
-            logger.error(f"Gmail connection failed: {e}")
+            typ, data = mail.select("INBOX")
+            if typ != "OK":
+                raise mail.error(f"SELECT INBOX failed: {data[-1]!r}")
+        except Exception:
+            mail.shutdown()
             raise
-        finally:
-            if mail:
-                try:
-                    mail.logout()
-                    logger.debug("Gmail connection closed")
-                except Exception:
-                    pass
+        logger.debug("✓ Successfully connected to Gmail")
+        self._check_uidvalidity(mail)
+        # Unknown what arrived while disconnected; SELECT's EXISTS is just the count
+        mail.response("EXISTS")
+        self._inbox_changed = True
+        self._mail = mail
+        return mail
+    
+    def _check_uidvalidity(self, mail: imaplib.IMAP4_SSL):
+        """Forget the stored UID if the inbox's UIDVALIDITY changed since it was saved."""
+        _, data = mail.response("UIDVALIDITY")
+        if not data or data[0] is None:
+            return
+        uidvalidity = int(data[0])
+        if self._uidvalidity is not None and uidvalidity != self._uidvalidity:
+            logger.warning("Inbox UIDVALIDITY changed - discarding stored UID")
+            self.last_checked_uid = None
+        self._uidvalidity = uidvalidity
+    
+    def _load_state(self):
+        """Restore the last processed UID from GMAIL_STATE_PATH, if present."""
+        try:
+            state = json.loads(GMAIL_STATE_PATH.read_text(encoding="utf-8"))
+            self.last_checked_uid = int(state["uid"])
+            self._uidvalidity = state.get("uidvalidity")
+            logger.debug(f"Restored last checked UID: {self.last_checked_uid}")
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable {GMAIL_STATE_PATH}: {e}")
+    
+    def _save_state(self):
+        """Persist the last processed UID atomically."""
+        tmp_path = GMAIL_STATE_PATH.with_suffix(".json.tmp")
+        try:
+            GMAIL_STATE_PATH.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path.write_text(
+                json.dumps({"uid": self.last_checked_uid, "uidvalidity": self._uidvalidity}),
+                encoding="utf-8"
+            )
+            os.replace(tmp_path, GMAIL_STATE_PATH)
+        except OSError as e:
+            logger.warning(f"Could not save Gmail state: {e}")
+    
+    def _reset_connection(self):
+        """Drop the pooled connection without talking to the server."""
+        if self._mail is not None:
+            try:
+                self._mail.shutdown()
+            except Exception:
+                pass
+            self._mail = None
+    
+    def close(self):
+        """Log out and close the pooled IMAP connection."""
+        if self._mail is not None:
+            try:
+                self._mail.logout()
+                logger.debug("Gmail connection closed")
+            except Exception:
+                pass
+            self._mail = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
     
     def check_for_trigger_email(self) -> Dict[str, Any]:
         """Check if there's a new email from the trigger sender."""
         try:
-            with self.connect(timeout=15) as mail:
-                mail.select("inbox")
-                
-                sender = settings.gmail.trigger_sender
-                # Tighter regex/search: check specifically for "Nieuw rooster" in subject
-                search_criteria = f'(OR FROM "{sender}" FROM "rooster@roi-online.nl")'
-                
-                logger.debug(f"Searching for emails from: {sender}")
-                status, messages = mail.search(None, search_criteria)
-                
-                if status != "OK":
-                    logger.error("Failed to search emails")
-                    return {"found": False}
-                
-                email_ids = messages[0].split()
-                if not email_ids:
-                    logger.debug("No emails found from trigger sender")
-                    return {"found": False}
-                
-                latest_uid = email_ids[-1]
-                
-                if self.last_checked_uid is None:
-                    logger.info(f"First run - storing latest UID: {latest_uid.decode()}")
-                    self.last_checked_uid = latest_uid
-                    return {"found": False}
-                
-                if latest_uid > self.last_checked_uid:
-                    return self._process_found_email(mail, latest_uid)
-                
+            mail = self._get_mail()
+            if not self._inbox_changed:
+                logger.debug("No new mail since last check")
+                return {"found": False}
+            
+            sender = settings.gmail.trigger_sender
+            # Tighter regex/search: check specifically for "Nieuw rooster" in subject
+            search_criteria = f'(OR FROM "{sender}" FROM "rooster@roi-online.nl")'
+            
+            # Let the server restrict the search to mail we haven't seen yet:
+            # UIDs above the stored one, or only recent mail on a fresh install
+            if self.last_checked_uid is None:
+                since = (datetime.now(timezone.utc) - timedelta(days=BASELINE_SEARCH_DAYS)).strftime("%d-%b-%Y")
+                range_criteria = f"SINCE {since}"
+            else:
+                range_criteria = f"UID {self.last_checked_uid + 1}:*"
+            
+            logger.debug(f"Searching for emails from: {sender} ({range_criteria})")
+            status, messages = mail.uid("SEARCH", None, range_criteria, search_criteria)
+            
+            if status != "OK":
+                logger.error("Failed to search emails")
                 return {"found": False}
             
+            # "n:*" always matches the newest message, even when its UID is below n
+            uids = [int(uid) for uid in messages[0].split()]
+            if self.last_checked_uid is not None:
+                uids = [uid for uid in uids if uid > self.last_checked_uid]
+            
+            if not uids:
+                logger.debug("No new emails from trigger sender")
+                self._inbox_changed = False
+                return {"found": False}
+            
+            result = self._process_found_email(mail, str(max(uids)).encode())
+            if result["found"]:
+                # A failed fetch keeps the flag set, so the next poll retries it
+                self._inbox_changed = False
+            return result
+
         except Exception as e:
             logger.error(f"Error checking emails: {e}")
+            # Don't reuse a connection that may be in an unknown state
+            self._reset_connection()
             return {"found": False}
 
     def _process_found_email(self, mail, uid) -> Dict[str, Any]:
         """Process a found email and extract week information."""
         try:
-            status, msg_data = mail.fetch(uid, "(RFC822)")
+            status, msg_data = mail.uid("FETCH", uid, _FETCH_TRIGGER_PARTS)
             if status != "OK":
                 return {"found": False}
 
-            email_body = msg_data[0][1]
-            msg = email.message_from_bytes(email_body)
+            # Reassemble a parseable message: the header fields section ends
+            # with the blank separator line, the TEXT section follows it
+            parts = [item for item in msg_data if isinstance(item, tuple)]
+            headers = b"".join(data for spec, data in parts if b"HEADER" in spec)
+            text = b"".join(data for spec, data in parts if b"HEADER" not in spec)
+            msg = email.message_from_bytes(headers + text)
             subject = self._decode_header(msg["Subject"])
             
             logger.info(f"New trigger email! Subject: {subject}")
@@ -116,7 +238,8 @@ class GmailMonitor:
             else:
                 logger.warning("Could not extract week number from email body")
 
-            self.last_checked_uid = uid
+            self.last_checked_uid = int(uid)
+            self._save_state()
             return {
                 "found": True,
                 "week": target_week,
@@ -140,21 +263,117 @@ class GmailMonitor:
         return result
     
     def monitor(self, callback: Callable, check_interval: Optional[int] = None):
-        """Monitor inbox and call callback when trigger email is found."""
+        """
+        Monitor inbox and call callback when trigger email is found.
+        Waits for new mail with IMAP IDLE; the inbox is also re-checked every
+        check_interval seconds as a safety net (and as plain polling for
+        servers without IDLE support).
+        """
         interval = check_interval or settings.gmail_check_interval
-        logger.info(f"Starting monitoring loop (checking every {interval}s)")
+        logger.info(f"Starting monitoring loop (IDLE push, re-checking at least every {interval}s)")
         
+        try:
+            self._monitor_loop(callback, interval)
+        finally:
+            self.close()
+    
+    def _monitor_loop(self, callback: Callable, interval: int):
+        """Check/wait loop of monitor(); the pooled connection is held across iterations."""
         while True:
             try:
-                if self.check_for_trigger_email():
+                if self.check_for_trigger_email()["found"]:
                     logger.info("Trigger detected! Executing callback...")
                     callback()
-                time.sleep(interval)
+                self.wait_for_new_mail(interval)
             except KeyboardInterrupt:
                 break
             except Exception as e:
                 logger.error(f"Error in monitor loop: {e}")
+                self._reset_connection()
                 time.sleep(interval)
+    
+    def wait_for_new_mail(self, timeout: float) -> bool:
+        """
+        Block for at most `timeout` seconds until the inbox may have new mail.
+        Uses IMAP IDLE, re-issued every IDLE_TIMEOUT_SECONDS; without IDLE
+        support this just sleeps for the whole timeout.
+        
+        Returns:
+            True if the server announced new mail, False when the timeout passed.
+        """
+        try:
+            mail = self._get_mail()
+            if "IDLE" not in mail.capabilities:
+                time.sleep(timeout)
+                return False
+            
+            deadline = time.monotonic() + timeout
+            while (remaining := deadline - time.monotonic()) > 0:
+                if self._idle(mail, min(remaining, IDLE_TIMEOUT_SECONDS)):
+                    logger.debug("IDLE: new mail announced")
+                    return True
+            return False
+        except _CONNECTION_ERRORS:
+            self._reset_connection()
+            raise
+    
+    def _idle(self, mail: imaplib.IMAP4_SSL, timeout: float) -> bool:
+        """
+        Run one IMAP IDLE (RFC 2177) exchange on the selected mailbox.
+        imaplib has no IDLE support before Python 3.14, so the command is
+        written to the connection directly.
+        
+        Returns:
+            True if the server announced a new message (EXISTS), False on timeout.
+        """
+        tag = mail._new_tag()
+        mail.send(tag + b" IDLE\r\n")
+        line = mail.readline()
+        if not line.startswith(b"+"):
+            raise imaplib.IMAP4.error(f"IDLE rejected: {line!r}")
+        
+        # Wake on the first untagged response. select() is used rather than a read
+        # timeout, which would leave imaplib's file object unusable afterwards.
+        # It only sees the socket, so skip it when a response is already buffered
+        if not self._response_buffered(mail):
+            select.select([mail.socket()], [], [], timeout)
+        
+        mail.send(b"DONE\r\n")
+        # Read everything up to the tagged completion of IDLE; responses that
+        # arrived together (e.g. EXPUNGE + EXISTS) are all seen here
+        got_exists = False
+        while True:
+            line = mail.readline()
+            if not line:
+                raise imaplib.IMAP4.abort("Connection closed during IDLE")
+            if line.startswith(tag):
+                break
+            got_exists = got_exists or line.rstrip().endswith(b"EXISTS")
+        if got_exists:
+            # These responses bypassed imaplib, so NOOP won't report them again
+            self._inbox_changed = True
+        return got_exists
+    
+    @staticmethod
+    def _response_buffered(mail: imaplib.IMAP4_SSL) -> bool:
+        """
+        Check without blocking whether response bytes are waiting in the TLS
+        layer or in imaplib's read buffer (e.g. an EXISTS that arrived in the
+        same packet as the IDLE continuation).
+        """
+        sock = mail.socket()
+        if hasattr(sock, "pending") and sock.pending():
+            return True
+        # peek() only reads from the socket when its buffer is empty; with the
+        # socket briefly non-blocking that read returns nothing instead of waiting
+        previous_timeout = sock.gettimeout()
+        sock.settimeout(0.0)
+        try:
+            return bool(mail.file.peek(1))
+        except (BlockingIOError, ssl.SSLWantReadError):
+            return False
+        finally:
+            sock.settimeout(previous_timeout)
 
 if __name__ == "__main__":
     from app.core.utils import setup_logging
@@ -3,26 +3,132 @@ ROI Online Scraper Module
 Downloads monthly roster as .ics file from ROI Online portal.
 """
 
+import json
 import logging
 import os
-from datetime import datetime
+import shutil
+from datetime import datetime, timedelta
 from pathlib import Path
 import re
-import time
-from playwright.sync_api import sync_playwright, Page, Download
+from typing import Optional, Tuple
+from playwright.sync_api import (
+    sync_playwright, Playwright, Browser, BrowserContext, Page, Download,
+    TimeoutError as PlaywrightTimeoutError
+)
 
 from app.core.settings import settings
 
 logger = logging.getLogger(__name__)
 
+# Upper bound for waiting on the element the next step needs (ms)
+READY_TIMEOUT_MS = 10_000
+
+# Saved cookies/localStorage from the last successful login (contains session
+# secrets), kept in the persisted shared folder so rebuilds don't force a login
+ROI_STATE_PATH = settings.state_dir / ".roi_state.json"
+
+# Headless Chromium only needs to drive a few form controls: skip GPU, /dev/shm and images
+CHROMIUM_ARGS = [
+    "--disable-gpu",
+    "--disable-dev-shm-usage",
+    "--disable-extensions",
+    "--blink-settings=imagesEnabled=false",
+]
+
+# Resource types the scraper never looks at; aborting them shortens page loads
+BLOCKED_RESOURCE_TYPES = frozenset({"image", "font", "media"})
+# Stylesheets are left alone by default: visibility checks depend on the layout
+BLOCK_STYLESHEETS = False
+
+# Ids that are safe to use in a "#id" CSS selector without escaping
+_PLAIN_ID_RE = re.compile(r'^[A-Za-z_][\w-]*$')
+
+# "<year> week <n>" as shown in the week display element
+_WEEK_DISPLAY_RE = re.compile(r'(\d{4})\s+week\s+(\d+)', re.IGNORECASE)
+
+# True once the week display shows the given ISO year and week
+_WEEK_DISPLAYED_JS = """([id, year, week]) => {
+    const el = document.getElementById(id);
+    const m = el && el.innerText.match(/(\\d{4})\\s+week\\s+(\\d+)/i);
+    return !!m && Number(m[1]) === year && Number(m[2]) === week;
+}"""
+
+
+def _id_selector(element_id: str) -> str:
+    """CSS selector for an element id; ids with ':' or '.' would need escaping after '#'."""
+    if _PLAIN_ID_RE.match(element_id):
+        return f"#{element_id}"
+    return '[id="{}"]'.format(element_id.replace('\\', '\\\\').replace('"', '\\"'))
+
 
 class ROIScraper:
     """Scraper for ROI Online roster system."""
     
     def __init__(self):
         """Initialize scraper."""
+        # Selectors for the configured element ids, built once
+        self._username_selector = _id_selector(settings.roi_username_field)
+        self._password_selector = _id_selector(settings.roi_password_field)
+        self._login_button_selector = _id_selector(settings.roi_login_button)
+        self._month_radio_selector = _id_selector(settings.roi_month_radio)
+        self._export_button_selector = _id_selector(settings.roi_calendar_export_button)
+        self._week_display_selector = _id_selector(settings.roi_week_display)
+        self._next_week_selector = _id_selector(settings.roi_next_week_button)
+        self._prev_week_selector = _id_selector(settings.roi_prev_week_button)
+        # Long-lived Playwright handles, started lazily and released by close()
+        self._playwright: Optional[Playwright] = None
+        self._browser: Optional[Browser] = None
+        self._context: Optional[BrowserContext] = None
+        self._reused_session = False
         logger.info("ROIScraper initialized")
     
+    @property
+    def browser(self) -> Browser:
+        """Get Chromium browser, launching it if needed."""
+        if self._browser is not None and not self._browser.is_connected():
+            # Crashed or killed: drop it and everything that depended on it
+            logger.warning("Chromium is no longer connected - relaunching")
+            self.close()
+        if self._browser is None:
+            logger.debug("Launching Chromium")
+            self._playwright = sync_playwright().start()
+            self._browser = self._playwright.chromium.launch(headless=True, args=CHROMIUM_ARGS)
+        return self._browser
+    
+    @property
+    def context(self) -> BrowserContext:
+        """Get browser context, restoring the saved login session if there is one."""
+        if self._context is None:
+            if ROI_STATE_PATH.exists():
+                try:
+                    self._context = self.browser.new_context(storage_state=str(ROI_STATE_PATH))
+                except Exception as e:
+                    # Corrupt, truncated or incompatible file: drop it and log in again
+                    logger.warning(f"Discarding unusable saved ROI session: {e}")
+                    ROI_STATE_PATH.unlink(missing_ok=True)
+            if self._context is None:
+                self._context = self.browser.new_context()
+            self._context.route("**/*", self._route_request)
+        return self._context
+    
+    @staticmethod
+    def _route_request(route) -> None:
+        """Abort requests for resources the scraper doesn't need."""
+        resource_type = route.request.resource_type
+        if resource_type in BLOCKED_RESOURCE_TYPES or (BLOCK_STYLESHEETS and resource_type == "stylesheet"):
+            route.abort()
+        else:
+            route.continue_()
+    
+    def _reset_context(self):
+        """Drop the browser context (and with it the in-memory session)."""
+        if self._context is not None:
+            try:
+                self._context.close()
+            except Exception:
+                pass
+            self._context = None
+    
     def download_roster(self, output_path: str, target_week: int = None, target_year: int = None) -> str:
         """
         Download the monthly roster as .ics file.
@@ -34,114 +140,204 @@ class ROIScraper:
         """
         logger.info(f"Starting ROI Online roster download (Week: {target_week or 'Current'})")
         
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            context = browser.new_context()
-            page = context.new_page()
-            
+        try:
             try:
-                self._navigate_and_login(page)
-                
-                if target_week:
-                    self._navigate_to_week(page, target_week, target_year)
-                
-                self._select_month_view(page)
-                ics_path = self._download_ics(page, output_path, target_week, target_year)
-                
-                logger.info(f"Successfully downloaded roster to {ics_path}")
-                return ics_path
-                
+                ics_path = self._run_download(output_path, target_week, target_year)
             except Exception as e:
-                logger.error(f"Error downloading roster: {e}")
-                raise
-            finally:
-                browser.close()
+                if self._browser is not None and not self._browser.is_connected():
+                    # The browser died mid-run: relaunch (via the property) and retry once
+                    logger.warning(f"Download failed because Chromium disconnected ({e}). Retrying...")
+                elif self._reused_session:
+                    # The saved session has most likely expired: start over with a full login
+                    logger.warning(f"Download with saved session failed ({e}). Retrying with fresh login...")
+                    self._reset_context()
+                    ROI_STATE_PATH.unlink(missing_ok=True)
+                else:
+                    raise
+                ics_path = self._run_download(output_path, target_week, target_year)
+            
+            logger.info(f"Successfully downloaded roster to {ics_path}")
+            return ics_path
+            
+        except Exception as e:
+            logger.error(f"Error downloading roster: {e}")
+            raise
+    
+    def _run_download(self, output_path: str, target_week: int = None, target_year: int = None) -> str:
+        """Run the login/navigate/download flow on a fresh page of the shared context."""
+        self._reused_session = False
+        # Health-check the long-lived browser before reusing its context
+        self.browser
+        page = self.context.new_page()
+        
+        try:
+            self._navigate_and_login(page)
+            
+            if target_week:
+                self._navigate_to_week(page, target_week, target_year)
+            
+            self._select_month_view(page)
+            return self._download_ics(page, output_path, target_week, target_year)
+        finally:
+            page.close()
     
     def _navigate_and_login(self, page: Page):
-        """Navigate to URL and login."""
+        """Navigate to URL and login, unless a saved session already got us in."""
         logger.info(f"Navigating to {settings.roi_url}")
-        page.goto(settings.roi_url, wait_until='networkidle')
+        page.goto(settings.roi_url, wait_until='domcontentloaded')
+        
+        # Either the login form or (with a valid saved session) the roster page shows up
+        page.locator(f"{self._username_selector}, {self._month_radio_selector}").first.wait_for(
+            state='visible', timeout=READY_TIMEOUT_MS
+        )
+        if not page.is_visible(self._username_selector):
+            logger.info("Reused saved session - skipping login")
+            self._reused_session = True
+            return
         
         logger.info("Logging in...")
-        page.fill(f"#{settings.roi_username_field}", settings.roi_email)
-        page.fill(f"#{settings.roi_password_field}", settings.roi_password)
+        page.fill(self._username_selector, settings.roi_email)
+        page.fill(self._password_selector, settings.roi_password)
         
-        page.click(f"#{settings.roi_login_button}")
-        page.wait_for_load_state('networkidle')
+        page.click(self._login_button_selector)
+        self._wait_ready(page, self._month_radio_selector)
         logger.info("Logged in successfully")
+        
+        self._save_session(page)
+    
+    def _save_session(self, page: Page):
+        """Persist cookies/localStorage so the next run can skip the login form."""
+        tmp_path = ROI_STATE_PATH.with_suffix(".json.tmp")
+        try:
+            state = page.context.storage_state()
+            ROI_STATE_PATH.parent.mkdir(parents=True, exist_ok=True)
+            # Owner-only from creation: the file is never readable by others,
+            # not even between writing and a later chmod
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                os.fchmod(f.fileno(), 0o600)  # a leftover tmp file keeps its old mode
+                json.dump(state, f)
+            os.replace(tmp_path, ROI_STATE_PATH)
+        except Exception as e:
+            logger.warning(f"Could not save ROI session state: {e}")
+    
+    def _wait_ready(self, page: Page, selector: str):
+        """
+        Wait until the DOM is loaded and the element matching `selector` is visible.
+        Much tighter than 'networkidle', which always waits for 500 ms of
+        network silence and can hang on long-polling pages.
+        """
+        page.wait_for_load_state('domcontentloaded')
+        page.locator(selector).wait_for(state='visible', timeout=READY_TIMEOUT_MS)
     
     def _select_month_view(self, page: Page):
         """Select the month view."""
         logger.debug("Selecting month view")
-        page.click(f"#{settings.roi_month_radio}")
-        page.wait_for_load_state('networkidle')
+        # Checking an already checked radio fires no postback to wait for
+        if not page.is_checked(self._month_radio_selector):
+            self._click_and_wait_for_postback(page, self._month_radio_selector)
+        self._wait_ready(page, self._export_button_selector)
+    
+    @staticmethod
+    def _click_and_wait_for_postback(page: Page, selector: str):
+        """
+        Click a control that triggers a WebForms postback and wait until it is done.
+        Elements of the old page stay visible until then, so waiting for them
+        would return right away. A partial (UpdatePanel) postback is done once
+        its POST response is in; a full one only once the new document loaded.
+        """
+        loaded = []
+        
+        def on_loaded(_page):
+            loaded.append(True)
+        
+        page.on("domcontentloaded", on_loaded)
+        try:
+            with page.expect_response(lambda r: r.request.method == "POST", timeout=READY_TIMEOUT_MS) as postback:
+                page.click(selector)
+            if postback.value.request.is_navigation_request() and not loaded:
+                page.wait_for_event("domcontentloaded", timeout=READY_TIMEOUT_MS)
+        finally:
+            page.remove_listener("domcontentloaded", on_loaded)
     
     def _navigate_to_week(self, page: Page, target_week: int, target_year: int = None):
         """Navigate to the specific week using robust ISO date math."""
         target_year = target_year or datetime.now().year
         logger.info(f"Navigating to week {target_week}, {target_year}")
         
-        MAX_RETRIES = 5  # preventing infinite loops if navigation fails repeatedly
-        MAX_CLICKS = 30  # preventing infinite loops if target is unreachable
+        MAX_CLICKS = 30  # total click budget; bounds runtime if target is unreachable
         
-        for attempt in range(MAX_RETRIES):
-             # Get current displayed week
-            try:
-                week_display = page.inner_text(f"#{settings.roi_week_display}", timeout=5000)
-            except Exception as e:
-                logger.warning(f"Could not read week display: {e}. Retrying...")
-                continue
-
-            logger.debug(f"Current week display: {week_display}")
-            
-            match = re.search(r'(\d{4})\s+week\s+(\d+)', week_display, re.IGNORECASE)
-            if not match:
-                logger.warning(f"Could not parse week display: {week_display}. Stopping navigation.")
-                return
-
-            current_year = int(match.group(1))
-            current_week = int(match.group(2))
+        try:
+            # %G = ISO Year, %V = ISO Week, %u = Weekday (1=Mon)
+            target_date = datetime.strptime(f"{target_year} {target_week} 1", "%G %V %u")
+        except ValueError as e:
+            logger.error(f"Date calculation error: {e}")
+            return
+        
+        current = self._read_displayed_week(page)
+        total_clicks = 0
+        
+        while current is not None:
+            current_year, current_week = current
             
             # Use ISO date math to calculate exact week difference
             try:
-                # %G = ISO Year, %V = ISO Week, %u = Weekday (1=Mon)
                 current_date = datetime.strptime(f"{current_year} {current_week} 1", "%G %V %u")
-                target_date = datetime.strptime(f"{target_year} {target_week} 1", "%G %V %u")
-                
-                diff_days = (target_date - current_date).days
-                diff_weeks = int(diff_days / 7)
             except ValueError as e:
                 logger.error(f"Date calculation error: {e}")
                 return
-
+            
+            diff_weeks = (target_date - current_date).days // 7
+            
             if diff_weeks == 0:
                 logger.info("✓ Successfully reached target week.")
                 return
-
-            if abs(diff_weeks) > MAX_CLICKS:
-                 logger.warning(f"Target is too far ({diff_weeks} weeks). Safety break.")
-                 return
-                 
-            # Click towards the target
-            button_id = settings.roi_next_week_button if diff_weeks > 0 else settings.roi_prev_week_button
             
-            # Optimize clicking: Don't click all at once if gap is huge, but do small batches
-            # Here we click once and check again to be safe and robust against network lag
-            # Or we could click a few times. Let's click min(abs(diff), 5) times to speed up but re-check often.
-            clicks_to_perform = min(abs(diff_weeks), 5)
+            if total_clicks + abs(diff_weeks) > MAX_CLICKS:
+                logger.warning(
+                    f"Target is too far ({diff_weeks} weeks, {total_clicks} clicks used). Safety break."
+                )
+                return
             
-            logger.info(f"Gap is {diff_weeks} weeks. Clicking {clicks_to_perform} times...")
+            # Click towards the target. Each click is a postback, so one click per
+            # step: clicks fired before the page reloaded would be lost
+            selector = self._next_week_selector if diff_weeks > 0 else self._prev_week_selector
             
-            for _ in range(clicks_to_perform):
-                page.click(f"#{button_id}")
-                # Small wait between clicks to ensure UI registers them
-                time.sleep(0.2)
+            logger.info(f"Gap is {diff_weeks} weeks. Clicking...")
             
-            # Wait for meaningful update
-            page.wait_for_load_state('networkidle')
-            time.sleep(0.5)
+            page.click(selector)
+            total_clicks += 1
             
-        logger.warning("Max retries reached without hitting target week.")
+            # Wait until the display shows the week that click should land on
+            step = timedelta(weeks=1 if diff_weeks > 0 else -1)
+            expected_year, expected_week, _ = (current_date + step).isocalendar()
+            try:
+                page.wait_for_function(
+                    _WEEK_DISPLAYED_JS,
+                    arg=[settings.roi_week_display, expected_year, expected_week],
+                    timeout=READY_TIMEOUT_MS
+                )
+                current = (expected_year, expected_week)
+            except PlaywrightTimeoutError:
+                logger.debug(f"Week display did not reach {expected_year} week {expected_week}; re-reading")
+                current = self._read_displayed_week(page)
+    
+    def _read_displayed_week(self, page: Page) -> Optional[Tuple[int, int]]:
+        """Read (year, week) from the week display, or None if it can't be read."""
+        try:
+            week_display = page.inner_text(self._week_display_selector, timeout=5000)
+        except Exception as e:
+            logger.warning(f"Could not read week display: {e}. Stopping navigation.")
+            return None
+        
+        logger.debug(f"Current week display: {week_display}")
+        
+        match = _WEEK_DISPLAY_RE.search(week_display)
+        if not match:
+            logger.warning(f"Could not parse week display: {week_display}. Stopping navigation.")
+            return None
+        
+        return int(match.group(1)), int(match.group(2))
 
     def _download_ics(self, page: Page, output_path: str, target_week: int = None, target_year: int = None) -> str:
         """Handle the file download."""
@@ -154,23 +350,54 @@ class ROIScraper:
         filepath = os.path.join(output_path, filename)
         
         logger.info("Initiating download...")
+        # No pre-wait: the month view step already waited for its postback and the
+        # export button, click() auto-waits for it and expect_download() races the
+        # download event
         with page.expect_download() as download_info:
-            page.click(f"#{settings.roi_calendar_export_button}")
+            page.click(self._export_button_selector)
         
         download: Download = download_info.value
-        download.save_as(filepath)
+        # Move Playwright's finished temp file into place (a rename on the same
+        # filesystem) rather than save_as, which writes a second copy
+        try:
+            shutil.move(download.path(), filepath)
+        except Exception as e:
+            logger.debug(f"Could not move the download, copying it instead: {e}")
+            download.save_as(filepath)
         
         return filepath
 
+    def close(self):
+        """Close the browser context, browser and Playwright driver."""
+        self._reset_context()
+        if self._browser is not None:
+            try:
+                self._browser.close()
+            except Exception:
+                pass
+            self._browser = None
+        if self._playwright is not None:
+            try:
+                self._playwright.stop()
+            except Exception:
+                pass
+            self._playwright = None
+
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
 
 if __name__ == "__main__":
-    from app.core.utils import setup_logging
+    from app.core.logging_config import setup_logging
     setup_logging("INFO", "%(asctime)s - %(message)s", "test_scraper.log")
     
     # Simple standalone run
-    scraper = ROIScraper()
-    try:
-        path = scraper.download_roster("./downloads")
-        print(f"Downloaded to: {path}")
-    except Exception as e:
-        print(f"Failed: {e}")
+    with ROIScraper() as scraper:
+        try:
+            path = scraper.download_roster("./downloads")
+            print(f"Downloaded to: {path}")
+        except Exception as e:
+            print(f"Failed: {e}")
@@ -1,19 +1,16 @@
 from playwright.sync_api import sync_playwright
+import sys
 import os
-from dotenv import load_dotenv
-import yaml
-import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 def investigate():
-    load_dotenv()
-    
-    with open('config/config.yaml', 'r') as f:
-        conf = yaml.safe_load(f)
+    # Imported here so importing this module doesn't read config.yaml/.env
+    from app.core.settings import settings
     print("Loaded config.")
     
-    roi_conf = conf['roi_online']
-    email = os.getenv('ROI_EMAIL')
-    password = os.getenv('ROI_PASSWORD')
+    roi_conf = settings.roi_online.model_dump()
+    email = settings.roi_email
+    password = settings.roi_password
     
     if not email or not password:
         print("Error: Credentials not found in environment.")
@@ -23,14 +20,15 @@ def investigate():
         browser = p.chromium.launch(headless=True)
         page = browser.new_page()
         print(f"Navigating to {roi_conf['url']}...")
-        page.goto(roi_conf['url'])
+        page.goto(roi_conf['url'], wait_until='domcontentloaded')
         
         print("Logging in...")
         try:
             page.fill(f"#{roi_conf['username_field_id']}", email)
             page.fill(f"#{roi_conf['password_field_id']}", password)
             page.click(f"#{roi_conf['login_button_id']}")
-            page.wait_for_load_state('networkidle')
+            # Wait for the roster page itself rather than for network silence
+            page.wait_for_selector(f"#{roi_conf['month_radio_button_id']}", state='visible')
             print("Logged in.")
         except Exception as e:
             print(f"Login failed: {e}")
@@ -40,28 +38,53 @@ def investigate():
         print(f"Current URL: {page.url}")
         
         # Look for buttons related to week navigation
-        buttons = page.query_selector_all('button, input[type="button"], input[type="submit"], a.btn, span.btn, div[role="button"]')
+        # Collect text and attributes in one evaluate() instead of four
+        # round-trips to the browser per element
+        buttons = page.eval_on_selector_all(
+            'button, input[type="button"], input[type="submit"], a.btn, span.btn, div[role="button"]',
+            """els => els.map(el => ({
+                txt: el.innerText || '',
+                val: el.getAttribute('value') || '',
+                title: el.getAttribute('title') || '',
+                id: el.getAttribute('id') || ''
+            }))"""
+        )
         print(f"Found potential interactive elements. Scanning for navigation cues...")
         
         for btn in buttons:
-            try:
-                txt = btn.inner_text()
-                val = btn.get_attribute('value') or ''
-                title = btn.get_attribute('title') or ''
-                id_attr = btn.get_attribute('id') or ''
-                
-                # Check for keywords
-                s = (txt + val + title + id_attr).lower()
-                if any(k in s for k in ['next', 'prev', 'volgende', 'vorige', 'week', 'fwd', 'bwd', 'cal', 'date']):
-                    print(f"Candidate: Text='{txt}', Value='{val}', ID='{id_attr}', Title='{title}'")
-            except:
-                pass
+            txt, val, title, id_attr = btn['txt'], btn['val'], btn['title'], btn['id']
+            
+            # Check for keywords
+            s = (txt + val + title + id_attr).lower()
+            if any(k in s for k in ['next', 'prev', 'volgende', 'vorige', 'week', 'fwd', 'bwd', 'cal', 'date']):
+                print(f"Candidate: Text='{txt}', Value='{val}', ID='{id_attr}', Title='{title}'")
 
         # Also dump the page HTML to a file
         with open('page_dump.html', 'w', encoding='utf-8') as f:
             f.write(page.content())
         print("Saved page_dump.html")
         
+        # Record what the export actually requests, to judge whether a plain HTTP
+        # client with the session cookie could fetch the .ics without a browser
+        export_requests = []
+        page.on("request", lambda req: export_requests.append(req)
+                if req.resource_type in ("document", "xhr", "fetch") else None)
+        try:
+            page.click(f"#{roi_conf['month_radio_button_id']}")
+            page.wait_for_selector(f"#{roi_conf['calendar_export_button_id']}", state='visible')
+            with page.expect_download() as download_info:
+                page.click(f"#{roi_conf['calendar_export_button_id']}")
+            print(f"Export download URL: {download_info.value.url}")
+        except Exception as e:
+            print(f"Export probe failed: {e}")
+        
+        for req in export_requests:
+            post_size = len(req.post_data_buffer or b"")
+            print(f"Request: {req.method} {req.url} (POST body: {post_size} bytes)")
+        # Names only: cookie values are session secrets
+        cookie_names = [f"{c['name']} ({c['domain']})" for c in page.context.cookies()]
+        print(f"Session cookies: {', '.join(cookie_names)}")
+        
         browser.close()
 
 if __name__ == "__main__":
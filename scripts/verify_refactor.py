@@ -7,12 +7,23 @@ import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+import importlib
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from app.core.settings import settings
-from app.core.utils import setup_logging
-from app.services.roi_scraper import ROIScraper
-from app.services.gmail_monitor import GmailMonitor
-from app.services.calendar_service import CalendarService
+from app.core.logging_config import setup_logging
+
+# Components checked in step 2, imported there so a broken or slow dependency
+# (playwright, caldav) shows up as a FAIL line instead of an import traceback
+COMPONENTS = [
+    ("app.services.roi_scraper", "ROIScraper"),
+    ("app.services.gmail_monitor", "GmailMonitor"),
+    ("app.services.calendar_service", "CalendarService"),
+]
+
+def _init_component(module_name, class_name):
+    """Import a component's module and instantiate the class."""
+    return getattr(importlib.import_module(module_name), class_name)()
 
 def verify():
     print("1. Verifying Settings...")
@@ -26,14 +37,16 @@ def verify():
         
     print("\n2. Verifying Components Initialization...")
     try:
-        print("   - Initializing ROIScraper...")
-        scraper = ROIScraper()
-        
-        print("   - Initializing GmailMonitor...")
-        monitor = GmailMonitor()
-        
-        print("   - Initializing CalendarService...")
-        storage = CalendarService()
+        # Components are independent: import and build them concurrently,
+        # then report in the usual order
+        with ThreadPoolExecutor(max_workers=len(COMPONENTS)) as executor:
+            futures = [
+                (class_name, executor.submit(_init_component, module_name, class_name))
+                for module_name, class_name in COMPONENTS
+            ]
+            for class_name, future in futures:
+                print(f"   - Initializing {class_name}...")
+                future.result()
         
     except Exception as e:
         print(f"   FAIL: {e}")
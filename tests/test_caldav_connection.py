@@ -5,11 +5,22 @@ This helps identify the root cause of connection issues.
 
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+def _get_principal(caldav_url, caldav_username, caldav_password):
+    """Create a DAVClient and fetch the principal (runs in the background)."""
+    import caldav
+    client = caldav.DAVClient(
+        url=caldav_url,
+        username=caldav_username,
+        password=caldav_password
+    )
+    return client.principal()
+
 def test_caldav_connection():
     """Test CalDAV connection with detailed diagnostics."""
     
@@ -31,6 +42,14 @@ def test_caldav_connection():
         print("\n❌ ERROR: Missing CalDAV credentials in .env file")
         return False
     
+    # The URL probe and the principal lookup are independent: start the
+    # principal's round-trips in the background while the probe runs
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        principal_future = executor.submit(_get_principal, caldav_url, caldav_username, caldav_password)
+        return _run_checks(caldav_url, principal_future)
+
+def _run_checks(caldav_url, principal_future):
+    """Report the URL probe, then the (already running) principal lookup."""
     # Test 1: Basic URL connectivity
     print(f"\n2. Testing URL connectivity...")
     try:
@@ -44,18 +63,8 @@ def test_caldav_connection():
     # Test 2: CalDAV client connection
     print(f"\n3. Testing CalDAV client connection...")
     try:
-        import caldav
-        
-        print(f"   Creating DAVClient...")
-        client = caldav.DAVClient(
-            url=caldav_url,
-            username=caldav_username,
-            password=caldav_password
-        )
-        print(f"   ✓ DAVClient created")
-        
-        print(f"   Attempting to get principal...")
-        principal = client.principal()
+        print(f"   Creating DAVClient and getting principal...")
+        principal = principal_future.result()
         print(f"   ✓ Principal obtained successfully!")
         
         # Test 3: List calendars
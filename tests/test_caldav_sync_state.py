@@ -0,0 +1,159 @@
+"""
+Tests for skipping unchanged events on upload (app/services/calendar_service.py).
+Uses an in-memory calendar that answers sync-collection reports like caldav 1.3.
+"""
+
+import itertools
+import types
+
+import pytest
+from caldav.elements import dav
+from caldav.lib.url import URL
+
+from app.services import calendar_service
+from app.services.calendar_service import CalendarService, _ics_property
+
+CALENDAR_URL = "https://caldav.example.com/cal/"
+
+HEADER = "BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//test//EN\r\n"
+
+
+def _vevent(uid, summary):
+    return f"BEGIN:VEVENT\r\nUID:{uid}\r\nSUMMARY:{summary}\r\nEND:VEVENT\r\n"
+
+
+class FakeCalendar:
+    """Calendar collection with ETags and a sync-token per change."""
+
+    def __init__(self):
+        self.name = "Rooster"
+        self.url = URL.objectify(CALENDAR_URL)
+        self.etags = {}  # url -> etag of the stored resource
+        self.changes = []  # urls in order of change, one sync-token each
+        self.saves = []  # UIDs PUT, in order
+        self.reject_tokens = False
+        self._etag_counter = itertools.count(1)
+
+    def _touch(self, url, etag):
+        self.etags[url] = etag
+        self.changes.append(url)
+
+    def save_event(self, ics):
+        uid = _ics_property(ics, "UID")
+        self.saves.append(uid)
+        url = f"{CALENDAR_URL}{uid}.ics"
+        self._touch(url, f'"{next(self._etag_counter)}"')
+        return types.SimpleNamespace(url=URL.objectify(url))
+
+    def edit_on_server(self, uid):
+        self._touch(f"{CALENDAR_URL}{uid}.ics", f'"{next(self._etag_counter)}"')
+
+    def delete_on_server(self, uid, report=True):
+        url = f"{CALENDAR_URL}{uid}.ics"
+        self.etags.pop(url, None)
+        if report:
+            self.changes.append(url)
+
+    def objects_by_sync_token(self, sync_token=None, load_objects=False):
+        if sync_token is None:
+            urls = list(self.etags)
+        elif self.reject_tokens:
+            raise RuntimeError("403 Forbidden: valid-sync-token")
+        else:
+            urls = dict.fromkeys(self.changes[int(sync_token):])
+        objects = [
+            types.SimpleNamespace(
+                url=URL.objectify(url),
+                props={dav.GetEtag.tag: self.etags[url]} if url in self.etags else {},
+            )
+            for url in urls
+        ]
+        return _Collection(objects, str(len(self.changes)))
+
+
+class _Collection(list):
+    """Iterable result carrying the new sync-token, like SynchronizableCalendarObjectCollection."""
+
+    def __init__(self, objects, sync_token):
+        super().__init__(objects)
+        self.sync_token = sync_token
+
+
+@pytest.fixture
+def calendar(tmp_path, monkeypatch):
+    monkeypatch.setattr(calendar_service, "CALDAV_STATE_PATH", tmp_path / ".caldav_state.json")
+    return FakeCalendar()
+
+
+def _upload(calendar, *vevents):
+    return CalendarService()._upload_events(calendar, HEADER, list(vevents))
+
+
+def test_unchanged_events_are_skipped(calendar):
+    _upload(calendar, _vevent("a", "Dienst"), _vevent("b", "Dienst"))
+    calendar.saves.clear()
+
+    result = _upload(calendar, _vevent("a", "Dienst"), _vevent("b", "Dienst"))
+
+    assert calendar.saves == []
+    assert "2 unchanged" in result
+
+
+def test_changed_event_is_uploaded(calendar):
+    _upload(calendar, _vevent("a", "Dienst"), _vevent("b", "Dienst"))
+    calendar.saves.clear()
+
+    _upload(calendar, _vevent("a", "Vrij"), _vevent("b", "Dienst"))
+    assert calendar.saves == ["a"]
+
+    # The new ETag of the re-uploaded event is recorded, so it is skipped next time
+    calendar.saves.clear()
+    _upload(calendar, _vevent("a", "Vrij"), _vevent("b", "Dienst"))
+    assert calendar.saves == []
+
+
+def test_event_edited_on_server_is_uploaded(calendar):
+    _upload(calendar, _vevent("a", "Dienst"), _vevent("b", "Dienst"))
+    calendar.edit_on_server("a")
+    calendar.saves.clear()
+
+    _upload(calendar, _vevent("a", "Dienst"), _vevent("b", "Dienst"))
+
+    assert calendar.saves == ["a"]
+
+
+@pytest.mark.parametrize("reported", [True, False])
+def test_event_deleted_on_server_is_uploaded(calendar, reported):
+    """Also when the server leaves the deletion out of its sync report."""
+    _upload(calendar, _vevent("a", "Dienst"), _vevent("b", "Dienst"))
+    calendar.delete_on_server("a", report=reported)
+    calendar.saves.clear()
+
+    _upload(calendar, _vevent("a", "Dienst"), _vevent("b", "Dienst"))
+
+    assert calendar.saves == ["a"]
+
+
+def test_rejected_sync_token_keeps_nothing(calendar):
+    """Without the ETags of our PUTs no event can be skipped on the next run."""
+    calendar.reject_tokens = True
+    _upload(calendar, _vevent("a", "Dienst"), _vevent("b", "Dienst"))
+    calendar.reject_tokens = False
+    calendar.saves.clear()
+
+    _upload(calendar, _vevent("a", "Dienst"), _vevent("b", "Dienst"))
+
+    assert sorted(calendar.saves) == ["a", "b"]
+
+
+def test_failed_listing_uploads_everything(calendar):
+    _upload(calendar, _vevent("a", "Dienst"), _vevent("b", "Dienst"))
+    calendar.saves.clear()
+
+    def unsupported(sync_token=None, load_objects=False):
+        raise RuntimeError("501 Not Implemented")
+
+    calendar.objects_by_sync_token = unsupported
+    _upload(calendar, _vevent("a", "Dienst"), _vevent("b", "Dienst"))
+
+    assert sorted(calendar.saves) == ["a", "b"]
@@ -29,13 +29,13 @@ def test_lazy_initialization():
         print("✗ FAIL: Initialization took too long (eager connection)")
         return False
 
-def test_auto_connect():
+def test_auto_connect(storage=None):
     """Test that connection is automatically made on first use."""
     print("\n" + "=" * 60)
     print("Test 2: Auto-Connect on First Use")
     print("=" * 60)
     
-    storage = CalendarService()
+    storage = storage or CalendarService()
     print("Storage initialized (no connection yet)")
     
     # This should trigger auto-connect
@@ -48,23 +48,23 @@ def test_auto_connect():
         print("✗ FAIL: No calendars found")
         return False
 
-def test_connection_test_method():
-    """Test the test_connection() method."""
+def test_connection_test_method(storage=None):
+    """Test that the connection finds the configured calendar."""
     print("\n" + "=" * 60)
     print("Test 3: Connection Test Method")
     print("=" * 60)
     
-    storage = CalendarService()
-    result = storage.test_connection()
+    storage = storage or CalendarService()
+    calendar = storage.get_calendar()
     
-    if result:
-        print("✓ PASS: Connection test successful")
+    if calendar is not None:
+        print(f"✓ PASS: Connection test successful, using calendar: {calendar.name}")
         return True
     else:
         print("✗ FAIL: Connection test failed")
         return False
 
-def test_event_upload():
+def test_event_upload(storage=None):
     """Test event upload with existing ICS file."""
     print("\n" + "=" * 60)
     print("Test 4: Event Upload")
@@ -76,7 +76,7 @@ def test_event_upload():
         print(f"⚠ SKIP: Test file not found: {ics_file}")
         return None
     
-    storage = CalendarService()
+    storage = storage or CalendarService()
     
     try:
         result = storage.save_ics_file(ics_file)
@@ -93,7 +93,8 @@ def test_context_manager():
     print("=" * 60)
     
     try:
-        with CalDAVStorage() as storage:
+        # Its own service: leaving the block closes it, which must not hit the shared one
+        with CalendarService() as storage:
             calendars = storage.list_calendars()
             print(f"Found {len(calendars)} calendars inside context")
         
@@ -110,11 +111,15 @@ def main():
     
     results = []
     
+    # One service for tests 2-4: the CalDAV connection is made once (test 2
+    # checks that) and its keep-alive session is reused by the rest
+    storage = CalendarService()
+    
     # Run tests
     results.append(("Lazy Initialization", test_lazy_initialization()))
-    results.append(("Auto-Connect", test_auto_connect()))
-    results.append(("Connection Test", test_connection_test_method()))
-    results.append(("Event Upload", test_event_upload()))
+    results.append(("Auto-Connect", test_auto_connect(storage)))
+    results.append(("Connection Test", test_connection_test_method(storage)))
+    results.append(("Event Upload", test_event_upload(storage)))
     results.append(("Context Manager", test_context_manager()))
     
     # Summary
@@ -122,16 +127,17 @@ def main():
     print("Test Summary")
     print("=" * 60)
     
-    passed = sum(1 for _, result in results if result is True)
-    failed = sum(1 for _, result in results if result is False)
-    skipped = sum(1 for _, result in results if result is None)
-    
+    # Count while printing: one pass over the results
+    passed = failed = skipped = 0
     for name, result in results:
         if result is True:
+            passed += 1
             print(f"✓ {name}: PASS")
         elif result is False:
+            failed += 1
             print(f"✗ {name}: FAIL")
         else:
+            skipped += 1
             print(f"⚠ {name}: SKIP")
     
     print(f"\nTotal: {passed} passed, {failed} failed, {skipped} skipped")
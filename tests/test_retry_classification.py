@@ -0,0 +1,51 @@
+"""
+Tests for which CalDAV errors CalendarService retries.
+Builds the exceptions the way caldav 1.3 raises them from a server response.
+"""
+
+import types
+
+from caldav.lib import error
+from caldav.objects import errmsg
+
+from app.services.calendar_service import _is_retryable
+
+
+def _response(status, reason, raw="<error/>"):
+    """Minimal stand-in for the DAVResponse that caldav's errmsg() formats."""
+    return types.SimpleNamespace(status=status, reason=reason, raw=raw)
+
+
+def test_permanent_put_error_is_not_retried():
+    """A 400 on PUT (caldav: PutError(errmsg(r))) fails right away."""
+    e = error.PutError(errmsg(_response(400, "Bad Request")))
+    assert e.reason == "no reason"  # the status lives in str(e), not .reason
+    assert _is_retryable(e) is False
+
+
+def test_server_errors_are_retried():
+    """5xx responses and a 404 (reconnect case) are still retried."""
+    assert _is_retryable(error.PutError(errmsg(_response(503, "Service Unavailable")))) is True
+    assert _is_retryable(error.NotFoundError(errmsg(_response(404, "Not Found")))) is True
+
+
+def test_authorization_error_is_not_retried():
+    """AuthorizationError carries only the reason phrase and counts as a 403."""
+    e = error.AuthorizationError(url="https://p1-caldav.icloud.com:443/1234/", reason="Forbidden")
+    assert _is_retryable(e) is False
+
+
+def test_only_the_status_line_counts():
+    """Status-like text in the response body or in a URL doesn't decide."""
+    body = "<error>404 Not Found: see 400 Bad Request</error>"
+    assert _is_retryable(error.PutError(errmsg(_response(400, "Bad Request", body)))) is False
+    body = "<error>400 Bad Request upstream</error>"
+    assert _is_retryable(error.PutError(errmsg(_response(503, "Service Unavailable", body)))) is True
+    e = error.DAVError(url="https://caldav.example.com/cal/400 Bad/event.ics")
+    assert _is_retryable(e) is True
+
+
+def test_errors_without_status_are_retried():
+    """Connection problems carry no HTTP status and keep the normal retries."""
+    assert _is_retryable(ConnectionError("connection reset")) is True
+    assert _is_retryable(error.DAVError(url="https://caldav.icloud.com:443/123/calendars/")) is True